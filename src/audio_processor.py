@@ -3,10 +3,11 @@
 
 import os
 import logging
+import threading
 from pydub import AudioSegment
 from pydub.utils import mediainfo
 
-from .config import DEFAULT_AUDIO_FORMAT, DEFAULT_AUDIO_BITRATE
+from .config import DEFAULT_AUDIO_FORMAT, DEFAULT_AUDIO_BITRATE, DEFAULT_AUDIO_BITRATE_BPS
 from .utils import sanitize_filename
 
 logger = logging.getLogger(__name__)
@@ -14,6 +15,49 @@ logger = logging.getLogger(__name__)
 # Default tolerance for duration check in milliseconds (e.g., 5 seconds)
 DEFAULT_DURATION_TOLERANCE_MS = 5000
 
+# Bitrate can sometimes be slightly off, e.g., 320000 vs 319999, so accept a small window
+# around the configured bitrate. Computed once here rather than on every validation.
+BITRATE_TOLERANCE_BPS = 5000
+_MIN_BITRATE_BPS = DEFAULT_AUDIO_BITRATE_BPS - BITRATE_TOLERANCE_BPS
+_MAX_BITRATE_BPS = DEFAULT_AUDIO_BITRATE_BPS + BITRATE_TOLERANCE_BPS
+
+# Files produced by convert_to_mp3_320kbps in this process, keyed by absolute path.
+# Values are (mtime_ns, duration_ms). validate_mp3_320kbps consumes an entry instead of
+# re-probing a file we just exported with known format and bitrate.
+_RECENT_OUTPUTS: dict[str, tuple[int, int]] = {}
+_RECENT_OUTPUTS_LOCK = threading.Lock()
+
+def _remember_output(output_path: str, duration_ms: int):
+    """Records a freshly exported file so the following validation can trust it."""
+    try:
+        mtime_ns = os.stat(output_path).st_mtime_ns
+    except OSError:
+        return
+    with _RECENT_OUTPUTS_LOCK:
+        _RECENT_OUTPUTS[os.path.abspath(output_path)] = (mtime_ns, duration_ms)
+
+def _forget_output(output_path: str) -> tuple[int, int] | None:
+    """Removes and returns the recorded entry for output_path, if any."""
+    with _RECENT_OUTPUTS_LOCK:
+        return _RECENT_OUTPUTS.pop(os.path.abspath(output_path), None)
+
+def _duration_matches(file_path: str, actual_duration_ms: int, expected_duration_ms: int, duration_tolerance_ms: int) -> bool:
+    """Checks actual_duration_ms against expected_duration_ms and logs the outcome."""
+    lower_bound = expected_duration_ms - duration_tolerance_ms
+    upper_bound = expected_duration_ms + duration_tolerance_ms
+
+    if not (lower_bound <= actual_duration_ms <= upper_bound):
+        logger.warning(f"Validation failed for {file_path}: Duration mismatch. Expected {expected_duration_ms}ms, got {actual_duration_ms}ms (Tolerance: {duration_tolerance_ms}ms).")
+        return False
+    logger.info(f"Duration validation successful for {file_path}: Expected {expected_duration_ms}ms, got {actual_duration_ms}ms.")
+    return True
+
+def _build_tags(artist: str, title: str, album: str | None, track_number: str | None, year: str | None) -> dict[str, str]:
+    """Builds the ID3 tag dict handed to ffmpeg as -metadata pairs, skipping empty values."""
+    # pydub/ffmpeg expect 'tracknumber' for the track number and 'date' for the year
+    pairs = (("artist", artist), ("title", title), ("album", album), ("tracknumber", track_number), ("date", year))
+    return {key: value for key, value in pairs if value}
+
 def convert_to_mp3_320kbps(input_path: str, output_path: str, 
                            artist: str = "Unknown Artist", 
                            title: str = "Unknown Title", 
@@ -38,21 +82,13 @@ def convert_to_mp3_320kbps(input_path: str, output_path: str,
     Returns:
         True if conversion was successful, False otherwise.
     """
+    _forget_output(output_path) # Any previous record is stale once we overwrite the file
     try:
         logger.info(f"Attempting to convert {input_path} to MP3 320kbps with extended metadata.")
         audio = AudioSegment.from_file(input_path)
         
-        tags = {
-            "artist": artist,
-            "title": title,
-        }
-        if album:
-            tags["album"] = album
-        if track_number:
-            tags["tracknumber"] = track_number # pydub/ffmpeg usually expect 'tracknumber'
-        if year:
-            tags["date"] = year # pydub/ffmpeg usually expect 'date' for year
-        
+        tags = _build_tags(artist, title, album, track_number, year)
+
         # Ensure output directory exists
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
@@ -69,10 +105,12 @@ def convert_to_mp3_320kbps(input_path: str, output_path: str,
             logger.warning(f"Cover image path provided ({cover_image_path}) but file not found. Skipping cover art.")
 
         audio.export(output_path, **export_params)
+        _remember_output(output_path, len(audio))
         logger.info(f"Successfully converted {input_path} to {output_path} at {DEFAULT_AUDIO_BITRATE} with extended tags.")
         return True
     except Exception as e:
         logger.error(f"Error converting {input_path} to MP3: {e}")
+        _forget_output(output_path)
         # If output_path was created despite error, remove it
         if os.path.exists(output_path):
             try:
@@ -98,6 +136,22 @@ def validate_mp3_320kbps(file_path: str, expected_duration_ms: int | None = None
         logger.warning(f"Validation failed: File {file_path} does not exist.")
         return False
 
+    # Trust-on-produce: a file we exported ourselves and that is unchanged since then
+    # already has the expected format and bitrate, so skip the ffprobe round-trip.
+    recent_output = _forget_output(file_path)
+    if recent_output is not None:
+        produced_mtime_ns, produced_duration_ms = recent_output
+        try:
+            unchanged = os.stat(file_path).st_mtime_ns == produced_mtime_ns
+        except OSError:
+            unchanged = False
+        if unchanged:
+            if expected_duration_ms is not None and not _duration_matches(file_path, produced_duration_ms, expected_duration_ms, duration_tolerance_ms):
+                return False
+            logger.info(f"Validation successful for {file_path}: produced by this process at {DEFAULT_AUDIO_BITRATE}, skipping probe.")
+            return True
+        logger.info(f"{file_path} changed since it was produced. Running full validation.")
+
     try:
         info = mediainfo(file_path)
         # print(f"Media Info for {file_path}: {info}") # For debugging
@@ -107,10 +161,8 @@ def validate_mp3_320kbps(file_path: str, expected_duration_ms: int | None = None
         
         is_mp3 = "mp3" in file_format
         
-        # Bitrate can sometimes be slightly off, e.g., 320000 vs 319999
-        # We check if it's close to 320000 (320 kbps)
         bit_rate = int(bit_rate_str)
-        is_320kbps = (315000 <= bit_rate <= 325000) # Allowing a small tolerance
+        is_320kbps = (_MIN_BITRATE_BPS <= bit_rate <= _MAX_BITRATE_BPS)
 
         if not (is_mp3 and is_320kbps):
             logger.warning(f"Validation failed for {file_path}: Format={file_format}, Bitrate={bit_rate}bps. Expected MP3 and ~320kbps.")
@@ -121,13 +173,8 @@ def validate_mp3_320kbps(file_path: str, expected_duration_ms: int | None = None
             try:
                 audio = AudioSegment.from_file(file_path)
                 actual_duration_ms = int(audio.duration_seconds * 1000)
-                lower_bound = expected_duration_ms - duration_tolerance_ms
-                upper_bound = expected_duration_ms + duration_tolerance_ms
-
-                if not (lower_bound <= actual_duration_ms <= upper_bound):
-                    logger.warning(f"Validation failed for {file_path}: Duration mismatch. Expected {expected_duration_ms}ms, got {actual_duration_ms}ms (Tolerance: {duration_tolerance_ms}ms).")
+                if not _duration_matches(file_path, actual_duration_ms, expected_duration_ms, duration_tolerance_ms):
                     return False
-                logger.info(f"Duration validation successful for {file_path}: Expected {expected_duration_ms}ms, got {actual_duration_ms}ms.")
             except Exception as e:
                 logger.error(f"Error getting duration for {file_path}: {e}")
                 return False # Fail validation if duration can't be read
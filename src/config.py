@@ -1,17 +1,38 @@
 import os
+import re
 from dotenv import load_dotenv
-from pydub import AudioSegment
 
 load_dotenv()
 
 # Spotify API Credentials (loaded from .env file)
 SPOTIPY_CLIENT_ID = os.getenv("SPOTIPY_CLIENT_ID")
 SPOTIPY_CLIENT_SECRET = os.getenv("SPOTIPY_CLIENT_SECRET")
+HAS_SPOTIFY_CREDENTIALS = bool(SPOTIPY_CLIENT_ID and SPOTIPY_CLIENT_SECRET)
 
 # Default download settings
 DEFAULT_DOWNLOAD_DIR = "Downloads"
 DEFAULT_AUDIO_FORMAT = "mp3"
 DEFAULT_AUDIO_BITRATE = "320k" # 320 kbps
+DEFAULT_MAX_WORKERS = 4 # Tracks downloaded concurrently; keep low to avoid source rate limits
+
+_BITRATE_RE = re.compile(r"(\d+)[kK]")
+
+def _bitrate_to_bps(bitrate: str) -> int:
+    """Converts an ffmpeg-style bitrate such as '320k' to bits per second."""
+    match = _BITRATE_RE.fullmatch(bitrate.strip())
+    if not match:
+        raise ValueError(f"Invalid audio bitrate {bitrate!r}. Expected a value like '320k'.")
+    return int(match.group(1)) * 1000
+
+DEFAULT_AUDIO_BITRATE_BPS = _bitrate_to_bps(DEFAULT_AUDIO_BITRATE)
+
+# Per-user cache for data reused across runs (e.g. the Spotify access token)
+CACHE_DIR = os.getenv("MUSIC_RIPPER_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "musicripper")
+SPOTIFY_TOKEN_CACHE_FILE = os.path.join(CACHE_DIR, "spotify_token.json")
+TRACK_CACHE_FILE = os.path.join(CACHE_DIR, "tracks.json") # Validated downloads, so re-runs skip re-validating them
+FAILED_CACHE_FILE = os.path.join(CACHE_DIR, "failed.json") # Tracks no source could provide
+FAILED_CACHE_TTL_S = 7 * 24 * 60 * 60 # Known failures are skipped for a week before being retried
+PLAYLIST_CACHE_DIR = os.path.join(CACHE_DIR, "playlists") # Track lists keyed by playlist snapshot id
 
 # Logging configuration (Example)
 LOG_LEVEL = "INFO"
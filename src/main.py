@@ -2,62 +2,254 @@
 """Main entry point for the Music Ripper CLI application."""
 
 import argparse
+import atexit
+import functools
+import itertools
 import os
 import logging
-import sys
+import logging.handlers
+import queue
+import time
+from collections import Counter
+from contextlib import closing
+from typing import TYPE_CHECKING, Iterable, NamedTuple
 
-from rich.console import Console
+from rich.console import Console, Group
 from rich.table import Table
 from rich.progress import Progress, SpinnerColumn, BarColumn, TextColumn, TimeElapsedColumn, TimeRemainingColumn
 from rich.panel import Panel
 from rich.text import Text
 
-# Adjust path to import from sibling directories
-# This is a common pattern for structuring Python projects.
-# It ensures that when main.py is run, it can find other modules in the src package.
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Package-relative imports; run the CLI as a module: python -m src.main
+# SpotifyDownloader (spotipy, yt-dlp, pydub) is imported lazily in get_downloader()
+from .config import DEFAULT_DOWNLOAD_DIR, DEFAULT_MAX_WORKERS, HAS_SPOTIFY_CREDENTIALS, LOG_FILE, LOG_LEVEL
+from .utils import ensure_dir_exists
 
-from src.spotify_downloader import SpotifyDownloader
-from src.config import DEFAULT_DOWNLOAD_DIR, SPOTIPY_CLIENT_ID, SPOTIPY_CLIENT_SECRET
-from src.utils import ensure_dir_exists, sanitize_filename # For logging configuration in utils
+if TYPE_CHECKING:
+    from .spotify_downloader import SpotifyDownloader
 
-# Configure logging (ensure utils.py logging setup is respected or overridden here if needed)
-# The basicConfig in utils.py would have already set up root logger.
-# If more specific setup for main is needed, it can be done here.
 logger = logging.getLogger(__name__) # Get a logger specific to this module
 # Example: if you want to set a different level for this module's logger:
 # logger.setLevel(logging.DEBUG) 
 
+# Log records held in memory before being written to the log file (ERROR and above flush immediately)
+LOG_BUFFER_CAPACITY = 1024
 
+# Minimum seconds between progress-bar description changes; each change forces a Rich redraw.
+PROGRESS_DESCRIPTION_INTERVAL_S = 0.1
+# Redraw rate of the progress bar; tracks take seconds each, so a few frames per second is plenty.
+PROGRESS_REFRESH_PER_SECOND = 4
+
+# Pre-styled status cells for the summary table; Text cells skip per-row markup parsing.
+_SUCCESS_CELL = Text("Success", style="green")
+_FAILED_CELL = Text("Failed", style="red")
+
+class SummaryRow(NamedTuple):
+    """One row of the download summary table, in column order."""
+    status: Text
+    name: str
+    artist: str
+    source: str
+    details: str
+
+# Longer playlists show only the first and last SUMMARY_EDGE_ROWS successes (every failure is still listed).
+SUMMARY_MAX_ROWS = 100
+SUMMARY_EDGE_ROWS = 50
+
+# Summary table layout, built once: title and (header, style, width) per column.
+_SUMMARY_TITLE = Text("Download Summary", style="bold magenta")
+_SUMMARY_COLUMNS = (
+    ("Status", "dim", 12),
+    ("Track Name", None, None),
+    ("Artist", None, None),
+    ("Source", None, 10),
+    ("Details", None, None),
+)
+
+
+def setup_logging(log_file_path: str, level: str) -> logging.handlers.QueueListener:
+    """
+    Sends all log records to log_file_path through a queue drained by a background thread,
+    so download threads never block on file I/O. Records are written in batches of up to
+    LOG_BUFFER_CAPACITY; ERROR and above are flushed right away. The listener is stopped
+    (and the buffer flushed) at interpreter exit.
+    """
+    # Remove old handlers to avoid duplicate logs if script is re-run in same session (e.g. in an IDE)
+    for handler in logging.root.handlers[:]:
+        logging.root.removeHandler(handler)
+
+    # The format below doesn't use thread/process fields, so skip collecting them per record
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+
+    file_handler = logging.FileHandler(log_file_path, mode='a', delay=True) # Append mode; opened on first record
+    file_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(name)s - %(message)s"))
+    buffered_handler = logging.handlers.MemoryHandler(LOG_BUFFER_CAPACITY, flushLevel=logging.ERROR, target=file_handler)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    # QueueHandler renders message + traceback into the record; the file handler adds the prefix
+    queue_handler.setFormatter(logging.Formatter("%(message)s"))
+    logging.root.addHandler(queue_handler)
+    logging.root.setLevel(level)
+
+    listener = logging.handlers.QueueListener(log_queue, buffered_handler)
+    listener.start()
+    # Registered after logging's own shutdown hook, so it runs first and drains the queue
+    atexit.register(listener.stop)
+    return listener
+
+
+@functools.lru_cache(maxsize=1)
 def create_ui_elements():
-    """Creates Rich UI elements (console, tables, progress bars)."""
+    """Creates Rich UI elements (console, tables, progress bars). Built once per process."""
     console = Console()
     return console
 
-def display_summary(console: Console, downloaded_songs: list, failed_songs: list, download_folder: str):
-    """Displays a summary of the download process."""
-    summary_table = Table(title=Text("Download Summary", style="bold magenta"), show_header=True, header_style="bold blue")
-    summary_table.add_column("Status", style="dim", width=12)
-    summary_table.add_column("Track Name")
-    summary_table.add_column("Artist")
-    summary_table.add_column("Source", width=10)
-    summary_table.add_column("Details")
+@functools.lru_cache(maxsize=1)
+def get_downloader() -> "SpotifyDownloader":
+    """Returns the process-wide SpotifyDownloader so repeated main() calls reuse the Spotify client."""
+    from .spotify_downloader import SpotifyDownloader
+    return SpotifyDownloader()
+
+def _make_summary_table() -> Table:
+    """Returns an empty summary table with the standard title and columns."""
+    summary_table = Table(title=_SUMMARY_TITLE, show_header=True, header_style="bold blue")
+    for header, style, width in _SUMMARY_COLUMNS:
+        summary_table.add_column(header, style=style, width=width)
+    return summary_table
 
-    for song in downloaded_songs:
-        summary_table.add_row("[green]Success[/green]", song['name'], song['artist'], song.get('source', 'N/A'), f"Saved to {song['path']}")
-    
-    for song_info in failed_songs:
-        summary_table.add_row("[red]Failed[/red]", song_info['name'], song_info['artist'], "-", "Could not download/process")
+def display_summary(console: Console, summary_rows: list[SummaryRow], failed_count: int, download_folder: str,
+                    skipped_count: int = 0, playlist_truncated: bool = False):
+    """
+    Displays a summary of the download process. summary_rows are ready-made table rows
+    as built by process_tracks; download_folder is expected to be absolute.
+    skipped_count is how many of the failures were skipped as recently unavailable (see --retry-failed);
+    playlist_truncated adds a warning that the playlist could only be partly fetched.
+    Past SUMMARY_MAX_ROWS rows, successful tracks in the middle of the playlist are collapsed
+    into a single line so the table stays readable and quick to render.
+    """
+    summary_table = _make_summary_table()
+    if len(summary_rows) <= SUMMARY_MAX_ROWS:
+        for row in summary_rows:
+            summary_table.add_row(*row)
+    else:
+        middle_rows = summary_rows[SUMMARY_EDGE_ROWS:-SUMMARY_EDGE_ROWS]
+        middle_failures = [row for row in middle_rows if row.status is _FAILED_CELL]
+        for row in summary_rows[:SUMMARY_EDGE_ROWS]:
+            summary_table.add_row(*row)
+        for row in middle_failures:
+            summary_table.add_row(*row)
+        hidden_count = len(middle_rows) - len(middle_failures)
+        if hidden_count:
+            summary_table.add_row("...", Text(f"{hidden_count} more successful track(s) not shown", style="dim"), "", "", "")
+        for row in summary_rows[-SUMMARY_EDGE_ROWS:]:
+            summary_table.add_row(*row)
 
-    console.print(summary_table)
-    console.print(f"\nAll processing finished. Files are in: [cyan]{os.path.abspath(download_folder)}[/cyan]")
-    if failed_songs:
-        console.print(f"[yellow]{len(failed_songs)} song(s) could not be processed. Check logs for details.[/yellow]")
+    # Rendered as one Group so the summary is laid out and written in a single print
+    renderables = [summary_table, Text.from_markup(f"\nAll processing finished. Files are in: [cyan]{download_folder}[/cyan]")]
+    if failed_count:
+        renderables.append(Text.from_markup(f"[yellow]{failed_count} song(s) could not be processed. Check logs for details.[/yellow]"))
+    if skipped_count:
+        renderables.append(Text.from_markup(f"[yellow]{skipped_count} of them were skipped because no source had them on a run in the last week. Use --retry-failed to try them again.[/yellow]"))
+    if playlist_truncated:
+        renderables.append(Text.from_markup("[bold yellow]Fetching the playlist stopped on an error, so some tracks were not downloaded. Check logs and run again.[/bold yellow]"))
+    console.print(Group(*renderables))
+
+
+def process_tracks(console: Console, downloader: "SpotifyDownloader", tracks: Iterable[dict], download_folder: str,
+                   max_workers: int = DEFAULT_MAX_WORKERS) -> tuple[list[SummaryRow], int]:
+    """
+    Downloads tracks concurrently on a pool of at most max_workers threads while showing progress.
+    tracks may be a lazy iterator (e.g. SpotifyDownloader.iter_playlist_tracks): each track is
+    submitted as soon as it is yielded, so downloads start while later playlist pages are fetched.
+    Returns (summary_rows, failed_count), with one summary table row per track in playlist order.
+    """
+    submitted_tracks: list[dict] = []
+    # Each worker result is written to its track's slot, so completion order doesn't reorder the summary
+    summary_rows: list[SummaryRow | None] = []
+    failed_count = 0
+    error_counts: Counter[str] = Counter() # Exceptions raised by download_song, by type
+
+    # Rich progress bar setup
+    with Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(),
+        TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
+        TimeRemainingColumn(),
+        TimeElapsedColumn(),
+        console=console,
+        refresh_per_second=PROGRESS_REFRESH_PER_SECOND,
+        transient=False # Keep progress bar visible after completion for a moment or until next print
+    ) as progress:
+        # The total grows as tracks arrive from the playlist
+        task_download = progress.add_task("[green]Downloading songs...", total=None)
+
+        def track_submitted(track_info: dict):
+            submitted_tracks.append(track_info)
+            summary_rows.append(None)
+            progress.update(task_download, total=len(submitted_tracks))
+
+        last_description_update = 0.0
+        # Downloads are network- and ffmpeg-bound, so several tracks can be in flight at once.
+        # closing() makes an interrupt cancel the queued tracks right away instead of at garbage collection.
+        with closing(downloader.iter_download_results(tracks, download_folder, max_workers, on_submit=track_submitted)) as downloads:
+            for index, future in downloads:
+                track_info = submitted_tracks[index]
+                name = track_info["name"]
+                artist = track_info["artist"]
+
+                try:
+                    file_path, source_name = future.result()
+                except OSError as e:
+                    # Disk/network trouble is common on a bad day; keep tracebacks out of the log unless debugging
+                    error_counts[type(e).__name__] += 1
+                    logger.warning("Error processing %s - %s: %s", artist, name, e, exc_info=logger.isEnabledFor(logging.DEBUG))
+                    file_path, source_name = None, None
+                except Exception as e:
+                    error_counts[type(e).__name__] += 1
+                    logger.error("Unexpected error processing %s - %s: %s", artist, name, e, exc_info=True)
+                    file_path, source_name = None, None
+
+                if file_path:
+                    summary_rows[index] = SummaryRow(_SUCCESS_CELL, name, artist, source_name or "Unknown", f"Saved to {file_path}")
+                    logger.info("Successfully processed: %s - %s from %s", artist, name, source_name)
+                else:
+                    summary_rows[index] = SummaryRow(_FAILED_CELL, name, artist, "-", "Could not download/process")
+                    failed_count += 1
+                    logger.warning("Failed to process: %s - %s", artist, name)
+
+                now = time.monotonic()
+                if now - last_description_update >= PROGRESS_DESCRIPTION_INTERVAL_S:
+                    progress.update(task_download, description=f"Finished: {artist} - {name}")
+                    last_description_update = now
+                progress.advance(task_download)
+
+        # Ensure progress bar finishes if transient=False is not fully effective or if you want a final message within it.
+        progress.update(task_download, description="[bold green]All tracks processed![/bold green]")
+
+    if error_counts:
+        logger.warning("Download errors by type: %s", ", ".join(f"{name} x{count}" for name, count in error_counts.most_common()))
+
+    return summary_rows, failed_count
+
+
+def _positive_int(value: str) -> int:
+    """argparse type for options that must be a positive integer."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a positive integer, got {value!r}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive integer, got {value!r}")
+    return number
 
 
 def main():
     """Main function to parse arguments and start the download process."""
-    parser = argparse.ArgumentParser(description=Text("Spotify Playlist Downloader", style="bold green"))
+    parser = argparse.ArgumentParser(description="Spotify Playlist Downloader")
     parser.add_argument("playlist_url", help="The URL of the Spotify playlist to download.")
     parser.add_argument(
         "download_folder", 
@@ -65,19 +257,33 @@ def main():
         default=DEFAULT_DOWNLOAD_DIR, 
         help=f"The folder where songs will be downloaded. Defaults to '{DEFAULT_DOWNLOAD_DIR}' in the current directory."
     )
+    parser.add_argument(
+        "--concurrency",
+        type=_positive_int,
+        default=DEFAULT_MAX_WORKERS,
+        help=f"How many tracks to download at the same time. Defaults to {DEFAULT_MAX_WORKERS}."
+    )
+    parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="Also retry tracks that no source could provide on a run in the last week."
+    )
 
     args = parser.parse_args()
+    # Logged only after parsing, so --help and usage errors leave the log file untouched
+    logger.info("Application started.")
+    download_folder = os.path.abspath(args.download_folder) # Resolved once, reused below
     console = create_ui_elements()
 
     console.print(Panel(Text("Spotify Music Ripper Initializing...", justify="center", style="bold blue")))
 
-    if not SPOTIPY_CLIENT_ID or not SPOTIPY_CLIENT_SECRET:
+    if not HAS_SPOTIFY_CREDENTIALS:
         console.print("[bold red]Error: Spotify API credentials (SPOTIPY_CLIENT_ID, SPOTIPY_CLIENT_SECRET) not found.[/bold red]")
         console.print("Please set them in a .env file in the project root as per the README.md.")
         return
 
     try:
-        downloader = SpotifyDownloader()
+        downloader = get_downloader()
     except ValueError as e:
         console.print(f"[bold red]Error initializing Spotify Downloader: {e}[/bold red]")
         return
@@ -86,80 +292,39 @@ def main():
         logger.error(f"Initialization failed: {e}", exc_info=True)
         return
 
+    downloader.begin_run(retry_failed=args.retry_failed) # The downloader is shared; don't carry over the last run's state
+
     console.print(f"Fetching track list from playlist: [link={args.playlist_url}]{args.playlist_url}[/link]")
-    tracks = downloader.get_playlist_tracks(args.playlist_url)
+    # Tracks are yielded page by page; downloads start while later pages are still being fetched
+    tracks = downloader.iter_playlist_tracks(args.playlist_url)
+    first_track = next(tracks, None)
 
-    if not tracks:
+    if first_track is None:
         console.print("[yellow]No tracks found in the playlist or could not fetch tracks. Exiting.[/yellow]")
         return
 
-    console.print(f"Found {len(tracks)} tracks. Preparing to download to: [cyan]{os.path.abspath(args.download_folder)}[/cyan]")
-    ensure_dir_exists(args.download_folder)
-
-    downloaded_songs = []
-    failed_songs = []
+    console.print(f"Downloading tracks to: [cyan]{download_folder}[/cyan]")
+    ensure_dir_exists(download_folder)
 
-    # Rich progress bar setup
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[progress.description]{task.description}"),
-        BarColumn(),
-        TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
-        TimeRemainingColumn(),
-        TimeElapsedColumn(),
-        console=console,
-        transient=False # Keep progress bar visible after completion for a moment or until next print
-    ) as progress:
-        task_download = progress.add_task("[green]Downloading songs...", total=len(tracks))
-
-        for i, track_info in enumerate(tracks):
-            progress.update(task_download, description=f"Processing: {track_info['artist']} - {track_info['name']}")
-            
-            # Attempt to download the song
-            file_path, source_name = downloader.download_song(track_info, args.download_folder)
-            
-            if file_path:
-                downloaded_songs.append({
-                    "name": track_info["name"], 
-                    "artist": track_info["artist"], 
-                    "path": file_path,
-                    "source": source_name or "Unknown" # Store the source
-                })
-                logger.info(f"Successfully processed: {track_info['artist']} - {track_info['name']} from {source_name}")
-            else:
-                failed_songs.append(track_info)
-                logger.warning(f"Failed to process: {track_info['artist']} - {track_info['name']}")
-            
-            progress.advance(task_download)
-        
-        # Ensure progress bar finishes if transient=False is not fully effective or if you want a final message within it.
-        progress.update(task_download, description="[bold green]All tracks processed![/bold green]")
+    try:
+        summary_rows, failed_count = process_tracks(console, downloader, itertools.chain((first_track,), tracks), download_folder, max_workers=args.concurrency)
+    finally:
+        downloader.save_caches() # Also keep what finished before an interrupt
 
-    display_summary(console, downloaded_songs, failed_songs, args.download_folder)
+    display_summary(console, summary_rows, failed_count, download_folder,
+                    skipped_count=downloader.skipped_recent_failures, playlist_truncated=downloader.playlist_truncated)
 
 if __name__ == "__main__":
     # Set up global logging to a file, in addition to console output handled by Rich.
     # This should be done once, preferably at the very start.
-    log_file_path = "music_ripper.log"
-    # Remove old handlers to avoid duplicate logs if script is re-run in same session (e.g. in an IDE)
-    for handler in logging.root.handlers[:]:
-        logging.root.removeHandler(handler)
-    
-    logging.basicConfig(
-        level=logging.INFO, 
-        format="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
-        handlers=[
-            logging.FileHandler(log_file_path, mode='a'), # Append mode
-            # logging.StreamHandler() # Already handled by Rich for console, but could be added if needed
-        ]
-    )
-    logger.info("Application started.")
+    log_file_path = LOG_FILE
+    setup_logging(log_file_path, LOG_LEVEL)
     try:
         main()
     except Exception as e:
         # Catch any unhandled exceptions from main and log them
         logger.critical(f"Unhandled exception in main: {e}", exc_info=True)
-        console = Console()
+        console = create_ui_elements()
         console.print(f"[bold red]An critical error occurred: {e}[/bold red]")
-        console.print("Please check the log file (music_ripper.log) for more details.")
+        console.print(f"Please check the log file ({log_file_path}) for more details.")
     logger.info("Application finished.") 
\ No newline at end of file
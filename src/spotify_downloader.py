@@ -4,14 +4,27 @@
 import os
 import logging
 import json # For saving metadata
-import tempfile # For temporary cover art
 import shutil # For cleaning up temp_download_folder if it has contents
+import sys
+import time
+import itertools
+import threading # download_song may run concurrently for several tracks
 import requests # For downloading cover art
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from collections import OrderedDict # LRU of downloaded cover art
+from contextlib import closing
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait # Pages, tracks and sources run in parallel
+from typing import Callable, Iterable, Iterator
 import spotipy
 from spotipy.oauth2 import SpotifyClientCredentials
+from spotipy.cache_handler import CacheFileHandler
 import yt_dlp
 
-from .config import SPOTIPY_CLIENT_ID, SPOTIPY_CLIENT_SECRET, DEFAULT_DOWNLOAD_DIR, DEFAULT_AUDIO_FORMAT
+from .config import (
+    SPOTIPY_CLIENT_ID, SPOTIPY_CLIENT_SECRET, DEFAULT_DOWNLOAD_DIR, DEFAULT_AUDIO_FORMAT, DEFAULT_MAX_WORKERS,
+    CACHE_DIR, SPOTIFY_TOKEN_CACHE_FILE, TRACK_CACHE_FILE, FAILED_CACHE_FILE, FAILED_CACHE_TTL_S, PLAYLIST_CACHE_DIR,
+)
 from .utils import sanitize_filename, ensure_dir_exists
 from .audio_processor import convert_to_mp3_320kbps, validate_mp3_320kbps
 
@@ -21,6 +34,18 @@ logger = logging.getLogger(__name__)
 MAX_SEARCH_RESULTS_PER_SOURCE = 3
 MIN_DURATION_PREFILTER_SECONDS = 45 # Pre-filter: skip if source reports duration less than this
 MIN_AUDIO_BITRATE_KBPS = 128      # Pre-filter: skip if source audio bitrate is less than this
+BITRATE_PREFILTER_SOURCES = {"YouTube"} # Sources whose reported bitrate is worth an extra metadata request per candidate
+COVER_ART_CACHE_SIZE = 32         # Album covers kept in memory so tracks of the same album share one download
+MAX_DOWNLOADS_PER_SOURCE = 4      # Concurrent searches/downloads against one source, however many workers run
+SOURCE_SLOT_POLL_S = 0.25         # How often an attempt waiting for a source slot checks whether the track was already won
+SOURCE_HEDGE_DELAY_S = 0.5        # Head start for the preferred source before the next one is raced against it
+COVER_ART_WORKERS = 4             # Background threads writing cover art while sources are searched
+# Only the playlist item fields _parse_playlist_item and the pager read; skips available_markets etc.
+PLAYLIST_ITEM_FIELDS = "limit,next,total,items(track(id,name,duration_ms,track_number,artists(name),album(name,release_date,images)))"
+PLAYLIST_PAGE_WORKERS = 4         # Playlist pages requested from Spotify at the same time
+SPOTIFY_REQUEST_TIMEOUT_S = 10    # Per-request timeout for Spotify API calls
+HTTP_TIMEOUT = (3.05, 30)         # (connect, read) seconds for cover art requests
+HTTP_POOL_SIZE = DEFAULT_MAX_WORKERS * 2 # Kept-alive connections per host, shared by the download threads
 
 class SpotifyDownloader:
     def __init__(self, client_id: str = None, client_secret: str = None):
@@ -31,52 +56,350 @@ class SpotifyDownloader:
             logger.error("Spotify API client ID or secret not configured.")
             raise ValueError("Spotify API client ID or secret not configured.")
 
+        # One session for all cover art requests, so connections are kept alive across tracks
+        self._http = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE,
+            max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504))
+        )
+        self._http.mount("https://", adapter)
+        self._http.mount("http://", adapter)
+
+        self._cover_art_cache: OrderedDict[str, bytes] = OrderedDict()
+        self._cover_art_lock = threading.Lock()
+        self._cover_art_pending: dict[str, Future] = {} # URL -> fetch in progress, shared by concurrent callers
+        # Output path -> [mtime_ns, size, source] of files validated by this or an earlier run
+        # Entries of the wrong shape (a hand-edited or foreign file) are dropped rather than failing startup.
+        # Sources repeat across the whole cache; intern them so each name is stored once.
+        self._track_cache: dict[str, list] = {
+            path: [entry[0], entry[1], sys.intern(entry[2])]
+            for path, entry in self._load_json_cache(TRACK_CACHE_FILE).items()
+            if isinstance(entry, list) and len(entry) == 3
+            and isinstance(entry[0], int) and isinstance(entry[1], int) and isinstance(entry[2], str)
+        }
+        # "Artist - Title" -> time.time() of the last run where no source could provide the track
+        self._failed_cache: dict[str, float] = {
+            track_key: failed_at for track_key, failed_at in self._load_json_cache(FAILED_CACHE_FILE).items()
+            if isinstance(failed_at, (int, float))
+        }
+        self._cover_pool = ThreadPoolExecutor(max_workers=COVER_ART_WORKERS) # Cover art fetched alongside source searches
+        # Caps concurrent yt-dlp work per source so a high --concurrency doesn't get us rate-limited or banned
+        self._source_slots = {name: threading.BoundedSemaphore(MAX_DOWNLOADS_PER_SOURCE) for name in ("SoundCloud", "YouTube")}
+        # ffmpeg is CPU-bound; more concurrent encodes than cores only slows every one of them down
+        self._transcode_slots = threading.BoundedSemaphore(os.cpu_count() or 1)
+        self._cache_lock = threading.Lock()
+        self._track_cache_dirty = self._failed_cache_dirty = False
+        self.retry_failed = False # Ignore the failed-track cache; set per run by begin_run()
+        self.skipped_recent_failures = 0 # Tracks skipped because of the failed-track cache
+        self.playlist_truncated = False # Set by iter_playlist_tracks when fetching stopped on an error
+        # One lock per output file, so a track listed twice in a playlist is not processed concurrently
+        self._output_locks: dict[str, threading.Lock] = {}
+        self._output_locks_guard = threading.Lock()
+
         try:
-            auth_manager = SpotifyClientCredentials(client_id=self.client_id, client_secret=self.client_secret)
-            self.sp = spotipy.Spotify(auth_manager=auth_manager)
+            # Reuse the access token across runs (valid for an hour) instead of requesting a new one each start
+            try:
+                ensure_dir_exists(CACHE_DIR)
+            except OSError:
+                logger.warning(f"Spotify token will not be cached; could not create {CACHE_DIR}")
+            auth_manager = SpotifyClientCredentials(
+                client_id=self.client_id, client_secret=self.client_secret,
+                cache_handler=CacheFileHandler(cache_path=SPOTIFY_TOKEN_CACHE_FILE)
+            )
+            self.sp = spotipy.Spotify(
+                auth_manager=auth_manager, requests_timeout=SPOTIFY_REQUEST_TIMEOUT_S,
+                retries=3, status_forcelist=(429, 500, 502, 503, 504)
+            )
+            # Fetch (or load the cached) token now, so parallel page requests don't all queue up for it
+            auth_manager.get_access_token(as_dict=False)
             logger.info("Spotify client initialized successfully.")
         except Exception as e:
             logger.error(f"Error initializing Spotify client: {e}")
             raise
 
-    def get_playlist_tracks(self, playlist_url: str) -> list[dict]:
-        track_list = []
+    def begin_run(self, retry_failed: bool = False):
+        """
+        Resets the per-run settings and counters. The downloader can be reused for several runs
+        in one process, so call this before each batch of downloads.
+        """
+        with self._cache_lock:
+            self.retry_failed = retry_failed
+            self.skipped_recent_failures = 0
+
+    @staticmethod
+    def _parse_playlist_item(item: dict) -> dict | None:
+        """Returns the track dict for one playlist item, or None for items without usable track metadata."""
+        track = item.get('track')
+        if not (track and track.get('name') and track.get('artists') and track.get('duration_ms')):
+            return None
+        track_name = track['name']
+        artists = ", ".join([artist['name'] for artist in track['artists']])
+        duration_ms = track['duration_ms']
+        album_info = track.get('album', {})
+        album_name = album_info.get('name')
+        track_number = track.get('track_number')
+        release_date = album_info.get('release_date')
+        year = release_date.split('-')[0] if release_date else None
+        cover_art_url = images[0].get('url') if (images := album_info.get('images', [])) else None
+
+        return {
+            "name": track_name, "artist": artists, "duration_ms": duration_ms,
+            "album": album_name, "track_number": str(track_number) if track_number else None,
+            "year": year, "cover_art_url": cover_art_url,
+            "spotify_track_id": track.get('id') # Store Spotify ID for reference
+        }
+
+    def iter_playlist_tracks(self, playlist_url: str) -> Iterator[dict]:
+        """
+        Yields the playlist's tracks page by page as they are fetched from Spotify, so callers
+        can start downloading the first tracks while the remaining pages are still requested.
+        Errors are logged and end the iteration early; playlist_truncated is then set, so callers
+        can tell a partial track list from a complete one.
+        """
+        self.playlist_truncated = False
+        track_count = 0
         try:
             playlist_id = playlist_url.split("/")[-1].split("?")[0]
-            results = self.sp.playlist_items(playlist_id)
-            items = results['items']
-            while results['next']:
-                results = self.sp.next(results)
-                items.extend(results['items'])
-            
-            for item in items:
-                track = item.get('track')
-                if track and track.get('name') and track.get('artists') and track.get('duration_ms'):
-                    track_name = track['name']
-                    artists = ", ".join([artist['name'] for artist in track['artists']])
-                    duration_ms = track['duration_ms']
-                    album_info = track.get('album', {})
-                    album_name = album_info.get('name')
-                    track_number = track.get('track_number')
-                    release_date = album_info.get('release_date')
-                    year = release_date.split('-')[0] if release_date else None
-                    cover_art_url = images[0].get('url') if (images := album_info.get('images', [])) else None
-
-                    track_list.append({
-                        "name": track_name, "artist": artists, "duration_ms": duration_ms,
-                        "album": album_name, "track_number": str(track_number) if track_number else None,
-                        "year": year, "cover_art_url": cover_art_url,
-                        "spotify_track_id": track.get('id') # Store Spotify ID for reference
-                    })
-            logger.info(f"Fetched {len(track_list)} tracks with extended metadata from: {playlist_url}")
+            # The snapshot id changes whenever the playlist does, so an unchanged playlist is served from disk
+            snapshot_id = self.sp.playlist(playlist_id, fields='snapshot_id').get('snapshot_id')
+            cache_path = os.path.join(PLAYLIST_CACHE_DIR, f"{sanitize_filename(playlist_id)}.json")
+            cached_playlist = self._load_json_cache(cache_path) if snapshot_id else {}
+            cached_tracks = cached_playlist.get('tracks')
+            # A cache of the wrong shape is ignored and the playlist fetched again
+            cache_usable = isinstance(cached_tracks, list) and all(
+                isinstance(track_dict, dict) and 'name' in track_dict and 'artist' in track_dict for track_dict in cached_tracks
+            )
+            if cached_playlist.get('snapshot_id') == snapshot_id and cache_usable:
+                logger.info(f"Playlist {playlist_id} is unchanged since the last run; using cached track list.")
+                for track_dict in cached_tracks:
+                    track_count += 1
+                    yield track_dict
+                logger.info(f"Loaded {track_count} cached tracks for: {playlist_url}")
+                return
+
+            fetched_tracks = []
+            first_page = self.sp.playlist_items(playlist_id, fields=PLAYLIST_ITEM_FIELDS)
+            # The first page gives the playlist size, so the remaining pages are requested in parallel
+            page_size = first_page.get('limit') or len(first_page['items'])
+            total = first_page.get('total')
+            with ThreadPoolExecutor(max_workers=PLAYLIST_PAGE_WORKERS) as executor:
+                if not first_page.get('next'):
+                    later_pages = ()
+                elif total is None or not page_size:
+                    later_pages = self._follow_next_pages(first_page) # Size unknown; walk the pages in order
+                else:
+                    # map() keeps playlist order and lets the first page be consumed while the rest download
+                    later_pages = executor.map(
+                        lambda offset: self.sp.playlist_items(playlist_id, fields=PLAYLIST_ITEM_FIELDS, offset=offset, limit=page_size),
+                        range(page_size, total, page_size)
+                    )
+                for page in itertools.chain((first_page,), later_pages):
+                    for item in page['items']:
+                        track_dict = self._parse_playlist_item(item)
+                        if track_dict:
+                            track_count += 1
+                            fetched_tracks.append(dict(track_dict)) # Copy; callers may add keys while we fetch
+                            yield track_dict
+            logger.info(f"Fetched {track_count} tracks with extended metadata from: {playlist_url}")
+            if snapshot_id:
+                self._write_json_cache(cache_path, {"snapshot_id": snapshot_id, "tracks": fetched_tracks})
         except Exception as e:
-            logger.error(f"Error fetching playlist tracks from {playlist_url}: {e}")
-        return track_list
+            self.playlist_truncated = True
+            logger.error(f"Error fetching playlist tracks from {playlist_url} after {track_count} track(s): {e}")
+
+    def _follow_next_pages(self, page: dict) -> Iterator[dict]:
+        """Yields the pages after page by following Spotify's 'next' links one at a time."""
+        while page.get('next'):
+            page = self.sp.next(page)
+            yield page
+
+    def get_playlist_tracks(self, playlist_url: str) -> list[dict]:
+        return list(self.iter_playlist_tracks(playlist_url))
+
+    @staticmethod
+    def _load_json_cache(cache_path: str) -> dict:
+        """Reads a JSON cache file; a missing or unreadable cache, or one that isn't a JSON object, just starts empty."""
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f_cache:
+                cache = json.load(f_cache)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cache {cache_path}: {e}")
+            return {}
+        if not isinstance(cache, dict):
+            logger.warning(f"Ignoring cache {cache_path}: expected a JSON object, got {type(cache).__name__}")
+            return {}
+        return cache
+
+    @staticmethod
+    def _write_json_cache(cache_path: str, snapshot: dict):
+        """Atomically replaces cache_path with snapshot; failures are logged, not raised."""
+        temp_path = f"{cache_path}.tmp"
+        try:
+            ensure_dir_exists(os.path.dirname(cache_path))
+            with open(temp_path, 'w', encoding='utf-8') as f_cache:
+                json.dump(snapshot, f_cache, ensure_ascii=False)
+            os.replace(temp_path, cache_path)
+        except OSError as e:
+            logger.warning(f"Could not save cache {cache_path}: {e}")
+
+    def save_caches(self):
+        """Writes the track and failed-track caches if they changed. Call once after a batch of downloads."""
+        with self._cache_lock:
+            track_snapshot = dict(self._track_cache) if self._track_cache_dirty else None
+            failed_snapshot = dict(self._failed_cache) if self._failed_cache_dirty else None
+            self._track_cache_dirty = self._failed_cache_dirty = False
+        if track_snapshot is not None:
+            self._write_json_cache(TRACK_CACHE_FILE, track_snapshot)
+        if failed_snapshot is not None:
+            self._write_json_cache(FAILED_CACHE_FILE, failed_snapshot)
+
+    def _cached_track_source(self, mp3_path: str) -> str | None:
+        """Returns the recorded source if mp3_path is unchanged since it was last validated, else None."""
+        try:
+            stat = os.stat(mp3_path)
+        except OSError:
+            return None
+        with self._cache_lock:
+            entry = self._track_cache.get(os.path.abspath(mp3_path))
+        if entry and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+            return entry[2]
+        return None
+
+    def _remember_track(self, mp3_path: str, source_name: str):
+        """Records mp3_path as validated, keyed by its current mtime and size."""
+        try:
+            stat = os.stat(mp3_path)
+        except OSError:
+            return
+        with self._cache_lock:
+            self._track_cache[os.path.abspath(mp3_path)] = [stat.st_mtime_ns, stat.st_size, source_name]
+            self._track_cache_dirty = True
+
+    def _failed_recently(self, track_key: str) -> bool:
+        """True if no source had a usable match for track_key within the last FAILED_CACHE_TTL_S seconds."""
+        with self._cache_lock:
+            failed_at = self._failed_cache.get(track_key)
+        return failed_at is not None and time.time() - failed_at < FAILED_CACHE_TTL_S
+
+    def _set_failed(self, track_key: str, failed: bool):
+        """Adds track_key to (or removes it from) the failed-track cache."""
+        with self._cache_lock:
+            if failed:
+                self._failed_cache[track_key] = time.time()
+                self._failed_cache_dirty = True
+            elif self._failed_cache.pop(track_key, None) is not None:
+                self._failed_cache_dirty = True
+
+    def _get_cover_art(self, cover_art_url: str) -> bytes:
+        """
+        Returns the image bytes for cover_art_url, downloading each URL only once.
+        Every track of an album shares the same cover URL, so an album-sized run
+        fetches the image a single time instead of once per track. Tracks of one album
+        usually start together, so callers arriving mid-fetch wait for that fetch.
+        """
+        fetch = None
+        with self._cover_art_lock:
+            cover_bytes = self._cover_art_cache.get(cover_art_url)
+            if cover_bytes is not None:
+                self._cover_art_cache.move_to_end(cover_art_url)
+            else:
+                pending = self._cover_art_pending.get(cover_art_url)
+                if pending is None:
+                    pending = fetch = self._cover_art_pending[cover_art_url] = Future()
+        if cover_bytes is not None:
+            logger.debug(f"Reusing cached cover art for: {cover_art_url}")
+            return cover_bytes
+        if fetch is None:
+            logger.debug(f"Waiting for the cover art fetch already in progress for: {cover_art_url}")
+            return pending.result() # Re-raises the fetching caller's error
+
+        try:
+            response = self._http.get(cover_art_url, timeout=HTTP_TIMEOUT)
+            response.raise_for_status()
+            cover_bytes = response.content
+        except BaseException as e:
+            with self._cover_art_lock:
+                del self._cover_art_pending[cover_art_url]
+            fetch.set_exception(e)
+            raise
+        with self._cover_art_lock:
+            del self._cover_art_pending[cover_art_url]
+            self._cover_art_cache[cover_art_url] = cover_bytes
+            if len(self._cover_art_cache) > COVER_ART_CACHE_SIZE:
+                self._cover_art_cache.popitem(last=False)
+        fetch.set_result(cover_bytes)
+        return cover_bytes
+
+    def _save_cover_art(self, track_info: dict, cover_art_url: str, temp_dir: str) -> str | None:
+        """Writes the track's cover art into temp_dir. Returns the image path, or None if it couldn't be fetched."""
+        try:
+            cover_bytes = self._get_cover_art(cover_art_url)
+            img_suffix = os.path.splitext(cover_art_url.split('?')[0])[-1] or '.jpg'
+            # temp_dir is unique to this song, so a fixed name can't collide
+            cover_path = os.path.join(temp_dir, f"cover{img_suffix}")
+            with open(cover_path, 'wb') as f_cover:
+                f_cover.write(cover_bytes)
+            logger.info(f"Downloaded cover art to: {cover_path}")
+            return cover_path
+        except Exception as e_cover:
+            logger.warning(f"Failed to download cover art for {track_info['artist']} - {track_info['name']}: {e_cover}")
+            return None
+
+    @staticmethod
+    def _raise_if_cancelled(cancel_event: threading.Event):
+        """yt-dlp progress hook: aborts the running download once cancel_event is set."""
+        if cancel_event.is_set():
+            raise yt_dlp.utils.DownloadCancelled("Another source already provided the track")
 
-    def _execute_download_attempt(self, track_info: dict, search_prefix_n: str, source_name: str, attempt_temp_folder: str) -> str | None:
+    @staticmethod
+    def _post_download_rejection(file_path: str, download_info: dict) -> str | None:
+        """
+        Duration and bitrate checks for entries downloaded without a metadata pre-check.
+        Returns why the file should be rejected, or None if it looks usable.
+        """
+        duration_sec = download_info.get('duration')
+        if not duration_sec:
+            return None
+        if duration_sec < MIN_DURATION_PREFILTER_SECONDS:
+            return f"short duration ({duration_sec}s < {MIN_DURATION_PREFILTER_SECONDS}s)"
+        average_kbps = os.path.getsize(file_path) * 8 / 1000 / duration_sec
+        # 5% slack: reported durations are rounded, so a true 128k stream can average just under 128
+        if average_kbps < MIN_AUDIO_BITRATE_KBPS * 0.95:
+            return f"low bitrate (~{average_kbps:.0f}kbps < {MIN_AUDIO_BITRATE_KBPS}kbps)"
+        return None
+
+    def _attempt_source(self, track_info: dict, source_name: str, search_prefix_n: str, temp_base: str,
+                        cancel_event: threading.Event) -> tuple[str | None, bool]:
+        """
+        Runs one source's download attempt in its own subfolder of temp_base, within that source's concurrency cap.
+        Returns the same (raw path, no match) pair as _execute_download_attempt.
+        """
+        logger.info(f"Attempting source: {source_name} for '{track_info['artist']} - {track_info['name']}'")
+        # Create a subfolder within temp_base for this source's raw downloads
+        source_attempt_temp_folder = os.path.join(temp_base, sanitize_filename(source_name) + "_raw_downloads")
+        source_slots = self._source_slots[source_name]
+        # Wait for a slot in short steps, so a track another source already won doesn't keep its worker waiting here
+        while not cancel_event.is_set():
+            if source_slots.acquire(timeout=SOURCE_SLOT_POLL_S):
+                break
+        else:
+            return None, False
+        try:
+            if cancel_event.is_set():
+                return None, False
+            return self._execute_download_attempt(track_info, search_prefix_n, source_name, source_attempt_temp_folder, cancel_event)
+        finally:
+            source_slots.release()
+
+    def _execute_download_attempt(self, track_info: dict, search_prefix_n: str, source_name: str, attempt_temp_folder: str,
+                                  cancel_event: threading.Event | None = None) -> tuple[str | None, bool]:
         """
         Attempts to download a single song from N search results from a given source.
-        Returns path to the raw downloaded audio file on first success, else None.
+        Returns (path to the raw downloaded audio file, False) on first success. On failure the path is None and
+        the flag tells whether the search worked but no result passed the filters (True), as opposed to a search
+        or download error (False). Gives up early (returning (None, False)) once cancel_event is set.
         """
         original_artist = track_info['artist']
         original_name = track_info['name']
@@ -93,126 +416,198 @@ class SpotifyDownloader:
 
         logger.info(f"Searching top {MAX_SEARCH_RESULTS_PER_SOURCE} results on {source_name} for: {search_query_base}")
         
-        ydl_opts_meta = {
+        # One YoutubeDL per attempt, used for the search and for every candidate's metadata and download
+        ydl_opts = {
             'quiet': True, 
             'noplaylist': True, 
             'default_search': search_prefix_n, # e.g. scsearch3, ytsearch3
+            'format': 'bestaudio/best',
+            # The search only lists candidates (title/duration/url); each one is fully resolved only if it gets that far
+            'extract_flat': 'in_playlist',
+            # Each candidate gets its own file (by media id) so attempts don't overwrite each other
+            'outtmpl': os.path.join(attempt_temp_folder, f"{sanitized_track_name}_attempt_%(id)s.%(ext)s"),
             'logger': logger,
             # 'match_filter': f'duration > {MIN_DURATION_PREFILTER_SECONDS}' # This applies to search query itself, might be too broad.
                                                                           # Better to filter after getting entries.
         }
+        if cancel_event is not None:
+            ydl_opts['progress_hooks'] = [lambda _status: self._raise_if_cancelled(cancel_event)]
 
-        search_entries = []
-        try:
-            with yt_dlp.YoutubeDL(ydl_opts_meta) as ydl_meta:
+        had_errors = False # Any result lost to an error rather than to the filters
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            search_entries = []
+            try:
                 # extract_info with a search query and download=False should give us a list of entries
-                meta_results = ydl_meta.extract_info(search_query_base, download=False)
+                meta_results = ydl.extract_info(search_query_base, download=False)
                 if meta_results and 'entries' in meta_results:
                     search_entries = meta_results['entries']
                 elif meta_results and meta_results.get('webpage_url'): # Single result from search (e.g. if scsearch1 was used)
                     search_entries = [meta_results] # Treat as a list with one entry
 
-        except yt_dlp.utils.DownloadError as de_meta:
-            logger.warning(f"Could not fetch search results from {source_name} for '{search_query_base}': {de_meta}")
-            return None
-        except Exception as e_meta:
-            logger.error(f"Unexpected error fetching search results from {source_name} for '{search_query_base}': {e_meta}")
-            return None
+            except yt_dlp.utils.DownloadError as de_meta:
+                logger.warning(f"Could not fetch search results from {source_name} for '{search_query_base}': {de_meta}")
+                return None, False
+            except Exception as e_meta:
+                logger.error(f"Unexpected error fetching search results from {source_name} for '{search_query_base}': {e_meta}")
+                return None, False
 
-        if not search_entries:
-            logger.info(f"No search results found on {source_name} for: {search_query_base}")
-            return None
+            if not search_entries:
+                logger.info(f"No search results found on {source_name} for: {search_query_base}")
+                return None, True
 
-        for i, entry in enumerate(search_entries):
-            if i >= MAX_SEARCH_RESULTS_PER_SOURCE: # Should be redundant if search_prefix_n works as expected
-                break
+            for i, entry in enumerate(search_entries):
+                if i >= MAX_SEARCH_RESULTS_PER_SOURCE: # Should be redundant if search_prefix_n works as expected
+                    break
+                if cancel_event is not None and cancel_event.is_set():
+                    logger.info(f"Stopping {source_name} attempt; another source already provided the track.")
+                    return None, False
 
-            entry_title = entry.get('title', 'Unknown Title')
-            entry_url = entry.get('webpage_url') or entry.get('url')
-            entry_duration_sec = entry.get('duration') # Duration in seconds from yt-dlp
+                entry_title = entry.get('title', 'Unknown Title')
+                entry_url = entry.get('webpage_url') or entry.get('url')
+                entry_duration_sec = entry.get('duration') # Duration in seconds from yt-dlp
 
-            logger.info(f"Considering {source_name} search result {i+1}/{len(search_entries)}: '{entry_title}' (duration: {entry_duration_sec}s)")
+                logger.info(f"Considering {source_name} search result {i+1}/{len(search_entries)}: '{entry_title}' (duration: {entry_duration_sec}s)")
 
-            if not entry_url:
-                logger.warning(f"Skipping search result {i+1} from {source_name} (no URL found).")
-                continue
+                if not entry_url:
+                    logger.warning(f"Skipping search result {i+1} from {source_name} (no URL found).")
+                    continue
 
-            if entry_duration_sec is not None and entry_duration_sec < MIN_DURATION_PREFILTER_SECONDS:
-                logger.info(f"Skipping search result {i+1} from {source_name} ('{entry_title}') due to short duration ({entry_duration_sec}s < {MIN_DURATION_PREFILTER_SECONDS}s)." )
-                continue
-            
-            # Pre-filter by audio bitrate before attempting full download of this specific entry
-            try:
-                logger.debug(f"Fetching detailed metadata for {source_name} entry: {entry_url} to check bitrate.")
-                ydl_opts_entry_specific_meta = {
-                    'quiet': True, 
-                    'logger': logger, 
-                    'format': 'bestaudio/best', # Ask yt-dlp to determine what it thinks is bestaudio
-                    # 'extract_flat': 'in_playlist', # Faster if we only need top-level meta like ABR
-                }
-                with yt_dlp.YoutubeDL(ydl_opts_entry_specific_meta) as ydl_esm:
-                    entry_specific_info = ydl_esm.extract_info(entry_url, download=False)
-                
-                selected_format_abr = entry_specific_info.get('abr') # abr for audio bitrate in kbps
-                # Some sources might provide tbr (total bitrate) instead of abr if it's audio only.
-                # Prefer abr if available.
-                if selected_format_abr is None and entry_specific_info.get('vcodec') == 'none': # If audio only, tbr might be abr
-                    selected_format_abr = entry_specific_info.get('tbr')
-
-                logger.debug(f"Reported ABR/TBR for {entry_url}: {selected_format_abr} kbps")
-
-                if selected_format_abr is not None and selected_format_abr < MIN_AUDIO_BITRATE_KBPS:
-                    logger.info(f"Skipping search result {i+1} from {source_name} ('{entry_title}') due to low source bitrate ({selected_format_abr}kbps < {MIN_AUDIO_BITRATE_KBPS}kbps).")
+                if entry_duration_sec is not None and entry_duration_sec < MIN_DURATION_PREFILTER_SECONDS:
+                    logger.info(f"Skipping search result {i+1} from {source_name} ('{entry_title}') due to short duration ({entry_duration_sec}s < {MIN_DURATION_PREFILTER_SECONDS}s)." )
                     continue
-                elif selected_format_abr is None:
-                    logger.warning(f"Could not determine audio bitrate for {source_name} entry '{entry_title}' ({entry_url}). Proceeding with download attempt.")
-            except yt_dlp.utils.DownloadError as de_esm:
-                logger.warning(f"Could not fetch specific metadata for bitrate check of {source_name} entry '{entry_title}' ({entry_url}): {de_esm}. Skipping this entry.")
-                continue
-            except Exception as e_esm:
-                logger.error(f"Unexpected error fetching specific metadata for bitrate check of {source_name} entry '{entry_title}' ({entry_url}): {e_esm}. Skipping this entry.")
-                continue
             
-            # Path for this specific attempt's raw download
-            # Use a unique name for each attempt to avoid overwriting within the attempt_temp_folder
-            temp_output_template_entry = os.path.join(attempt_temp_folder, f"{sanitized_track_name}_attempt_{i+1}.%(ext)s")
-
-            ydl_opts_download = {
-                'format': 'bestaudio/best',
-                'outtmpl': temp_output_template_entry,
-                'quiet': True,
-                'noplaylist': True, # Ensure we are downloading the specific entry
-                'logger': logger,
-                # No search, no match_filter here; we are downloading a specific URL
-            }
-            
-            temp_downloaded_actual_path = None
-            try:
-                logger.info(f"Attempting to download specific entry from {source_name}: '{entry_title}' ({entry_url})")
-                with yt_dlp.YoutubeDL(ydl_opts_download) as ydl_dl:
-                    # Download the specific entry URL
-                    download_info = ydl_dl.extract_info(entry_url, download=True)
+                # Pre-filter by audio bitrate before attempting full download of this specific entry.
+                # Search entries are flat listings, so this is the one full extraction per candidate. Sources whose
+                # reported bitrate says nothing (SoundCloud reports its transcoded stream) skip it: the download
+                # resolves the entry itself, and the file is checked by size afterwards instead.
+                prefilter_bitrate = source_name in BITRATE_PREFILTER_SOURCES
+                if entry.get('formats') or not prefilter_bitrate:
+                    entry_specific_info = entry
+                else:
+                    try:
+                        logger.debug(f"Fetching detailed metadata for {source_name} entry: {entry_url} to check bitrate.")
+                        entry_specific_info = ydl.extract_info(entry_url, download=False)
+                    except yt_dlp.utils.DownloadError as de_esm:
+                        logger.warning(f"Could not fetch specific metadata for bitrate check of {source_name} entry '{entry_title}' ({entry_url}): {de_esm}. Skipping this entry.")
+                        had_errors = True
+                        continue
+                    except Exception as e_esm:
+                        logger.error(f"Unexpected error fetching specific metadata for bitrate check of {source_name} entry '{entry_title}' ({entry_url}): {e_esm}. Skipping this entry.")
+                        had_errors = True
+                        continue
+
+                if prefilter_bitrate:
+                    # Some flat listings carry no duration, so apply the duration pre-filter here too
+                    resolved_duration_sec = entry_specific_info.get('duration')
+                    if entry_duration_sec is None and resolved_duration_sec is not None and resolved_duration_sec < MIN_DURATION_PREFILTER_SECONDS:
+                        logger.info(f"Skipping search result {i+1} from {source_name} ('{entry_title}') due to short duration ({resolved_duration_sec}s < {MIN_DURATION_PREFILTER_SECONDS}s)." )
+                        continue
+
+                    selected_format_abr = entry_specific_info.get('abr') # abr for audio bitrate in kbps
+                    # Some sources might provide tbr (total bitrate) instead of abr if it's audio only.
+                    # Prefer abr if available.
+                    if selected_format_abr is None and entry_specific_info.get('vcodec') == 'none': # If audio only, tbr might be abr
+                        selected_format_abr = entry_specific_info.get('tbr')
+
+                    logger.debug(f"Reported ABR/TBR for {entry_url}: {selected_format_abr} kbps")
+
+                    if selected_format_abr is not None and selected_format_abr < MIN_AUDIO_BITRATE_KBPS:
+                        logger.info(f"Skipping search result {i+1} from {source_name} ('{entry_title}') due to low source bitrate ({selected_format_abr}kbps < {MIN_AUDIO_BITRATE_KBPS}kbps).")
+                        continue
+                    elif selected_format_abr is None:
+                        logger.warning(f"Could not determine audio bitrate for {source_name} entry '{entry_title}' ({entry_url}). Proceeding with download attempt.")
+
+                temp_downloaded_actual_path = None
+                try:
+                    logger.info(f"Attempting to download specific entry from {source_name}: '{entry_title}' ({entry_url})")
+                    # Download from the already-extracted info instead of extracting the page again
+                    download_info = ydl.process_ie_result(entry_specific_info, download=True)
                     # The actual path is determined by outtmpl and the extension yt-dlp chooses
-                    temp_downloaded_actual_path = ydl_dl.prepare_filename(download_info)
+                    temp_downloaded_actual_path = ydl.prepare_filename(download_info)
+
+                    if temp_downloaded_actual_path and os.path.exists(temp_downloaded_actual_path):
+                        if not prefilter_bitrate:
+                            rejection = self._post_download_rejection(temp_downloaded_actual_path, download_info)
+                            if rejection:
+                                logger.info(f"Skipping search result {i+1} from {source_name} ('{entry_title}') after download: {rejection}.")
+                                try: os.remove(temp_downloaded_actual_path)
+                                except OSError: pass
+                                continue
+                        logger.info(f"Successfully downloaded raw audio for entry {i+1} from {source_name} to {temp_downloaded_actual_path}")
+                        return temp_downloaded_actual_path, False # Return path to raw audio
+                    else:
+                        logger.warning(f"Download of entry {i+1} from {source_name} ('{entry_title}') seemed to complete but file not found.")
+                        had_errors = True
 
-                if temp_downloaded_actual_path and os.path.exists(temp_downloaded_actual_path):
-                    logger.info(f"Successfully downloaded raw audio for entry {i+1} from {source_name} to {temp_downloaded_actual_path}")
-                    return temp_downloaded_actual_path # Return path to raw audio
-                else:
-                    logger.warning(f"Download of entry {i+1} from {source_name} ('{entry_title}') seemed to complete but file not found.")
+                except yt_dlp.utils.DownloadCancelled:
+                    logger.info(f"Cancelled download of entry {i+1} ('{entry_title}') from {source_name}; another source already provided the track.")
+                    return None, False
+                except yt_dlp.utils.DownloadError as de_dl:
+                    logger.warning(f"Failed to download entry {i+1} ('{entry_title}') from {source_name}: {de_dl}")
+                    had_errors = True
+                except Exception as e_dl:
+                    logger.error(f"Unexpected error downloading entry {i+1} ('{entry_title}') from {source_name}: {e_dl}")
+                    had_errors = True
 
-            except yt_dlp.utils.DownloadError as de_dl:
-                logger.warning(f"Failed to download entry {i+1} ('{entry_title}') from {source_name}: {de_dl}")
-            except Exception as e_dl:
-                logger.error(f"Unexpected error downloading entry {i+1} ('{entry_title}') from {source_name}: {e_dl}")
-            
-            # If download failed for this entry, loop to the next one
+                # If download failed for this entry, loop to the next one
 
         logger.info(f"All ({len(search_entries)}) search results from {source_name} for '{search_query_base}' failed pre-filter or download.")
-        return None # All entries failed
+        return None, not had_errors # All entries failed
+
+    def iter_download_results(self, tracks: Iterable[dict], download_dir: str, max_workers: int = DEFAULT_MAX_WORKERS,
+                              on_submit: Callable[[dict], None] | None = None) -> Iterator[tuple[int, Future]]:
+        """
+        Downloads tracks on a pool of max_workers threads, yielding (index, future) as each track finishes.
+        index is the track's position in tracks; future holds download_song()'s result or exception.
+        tracks may be a lazy iterator: each track is submitted as soon as it is yielded, and on_submit
+        (if given) is called with it. Closing the generator early cancels the tracks not yet started.
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            try:
+                futures = {}
+                for track_info in tracks:
+                    futures[executor.submit(self.download_song, track_info, download_dir)] = len(futures)
+                    if on_submit is not None:
+                        on_submit(track_info)
+                for future in as_completed(futures):
+                    yield futures[future], future
+            except BaseException:
+                # Interrupted or closed early: don't let the executor's exit wait for every queued track
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+
+    def download_songs(self, tracks: Iterable[dict], download_dir: str,
+                       max_workers: int = DEFAULT_MAX_WORKERS) -> list[tuple[str | None, str | None]]:
+        """
+        Downloads tracks on a pool of max_workers threads and saves the caches afterwards.
+        Returns one download_song() result per track, in input order.
+        """
+        results: list[tuple[str | None, str | None]] = []
+        try:
+            with closing(self.iter_download_results(tracks, download_dir, max_workers,
+                                                    on_submit=lambda _track_info: results.append((None, None)))) as downloads:
+                for index, future in downloads:
+                    try:
+                        results[index] = future.result()
+                    except Exception as e:
+                        logger.error(f"Unexpected error downloading track: {e}", exc_info=True)
+        finally:
+            self.save_caches()
+        return results
 
     def download_song(self, track_info: dict, download_dir: str) -> tuple[str | None, str | None]:
-        ensure_dir_exists(download_dir)
+        """
+        Downloads, converts and validates one track. Safe to call from several threads;
+        calls that resolve to the same output file are serialized.
+        Returns (path to the final MP3, source name), or (None, None) on failure.
+        """
+        output_key = os.path.abspath(os.path.join(download_dir, sanitize_filename(f"{track_info['artist']} - {track_info['name']}")))
+        with self._output_locks_guard:
+            output_lock = self._output_locks.setdefault(output_key, threading.Lock())
+        with output_lock:
+            return self._download_song(track_info, download_dir)
+
+    def _download_song(self, track_info: dict, download_dir: str) -> tuple[str | None, str | None]:
         original_artist = track_info['artist']
         original_name = track_info['name']
         sanitized_track_name = sanitize_filename(f"{original_artist} - {original_name}")
@@ -225,11 +620,12 @@ class SpotifyDownloader:
         if os.path.exists(song_specific_temp_base): # Clean if exists from a previous failed run for this song
             try: shutil.rmtree(song_specific_temp_base)
             except OSError: pass
-        ensure_dir_exists(song_specific_temp_base)
 
-        temp_cover_image_path = None
-        final_validated_mp3_path = None
-        successful_source_name = None
+        # Unchanged since an earlier run validated it: skip probing and the metadata JSON read
+        cached_source = self._cached_track_source(final_mp3_path)
+        if cached_source is not None:
+            logger.info(f"'{final_mp3_path}' was already downloaded from {cached_source}. Skipping download.")
+            return final_mp3_path, cached_source
 
         if os.path.exists(final_mp3_path):
             logger.info(f"'{final_mp3_path}' already exists. Validating...")
@@ -240,73 +636,106 @@ class SpotifyDownloader:
                     try:
                         with open(metadata_json_path, 'r', encoding='utf-8') as f_json_read:
                             existing_meta = json.load(f_json_read)
-                            existing_source = existing_meta.get('download_source', existing_source)
+                            existing_source = sys.intern(existing_meta.get('download_source', existing_source)) # Few distinct values; share one string each
                     except Exception: pass
-                shutil.rmtree(song_specific_temp_base) # Clean up temp base if we skip
+                self._remember_track(final_mp3_path, existing_source)
+                self._set_failed(sanitized_track_name, False)
                 return final_mp3_path, existing_source
             else:
                 logger.warning(f"Existing file '{final_mp3_path}' is invalid. Re-downloading.")
 
+        # Checked after the existing file, so a valid file on disk still clears a recent failure
+        if not self.retry_failed and self._failed_recently(sanitized_track_name):
+            logger.info(f"No source had '{original_artist} - {original_name}' on a recent run. Skipping (use --retry-failed to try again).")
+            with self._cache_lock:
+                self.skipped_recent_failures += 1
+            return None, None
+
+        ensure_dir_exists(song_specific_temp_base) # Also creates download_dir on first use
+
+        temp_cover_image_path = None
+        final_validated_mp3_path = None
+        successful_source_name = None
+
+        # Fetch the cover in the background while the sources are searched; it's only needed for tagging
         cover_art_url = track_info.get('cover_art_url')
-        if cover_art_url:
-            try:
-                response = requests.get(cover_art_url, stream=True, timeout=10)
-                response.raise_for_status()
-                img_suffix = os.path.splitext(cover_art_url.split('?')[0])[-1] or '.jpg'
-                with tempfile.NamedTemporaryFile(delete=False, suffix=img_suffix, dir=song_specific_temp_base, prefix="cover_") as tmp_cover:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        tmp_cover.write(chunk)
-                    temp_cover_image_path = tmp_cover.name
-                logger.info(f"Downloaded cover art to: {temp_cover_image_path}")
-            except Exception as e_cover:
-                logger.warning(f"Failed to download cover art for {original_artist} - {original_name}: {e_cover}")
+        cover_future = self._cover_pool.submit(self._save_cover_art, track_info, cover_art_url, song_specific_temp_base) if cover_art_url else None
 
         sources_to_try = [
             ("SoundCloud", f"scsearch{MAX_SEARCH_RESULTS_PER_SOURCE}"),
             ("YouTube",    f"ytsearch{MAX_SEARCH_RESULTS_PER_SOURCE}")
         ]
 
-        for source_name, search_prefix_n in sources_to_try:
-            logger.info(f"Attempting source: {source_name} for '{original_artist} - {original_name}'")
-            # Create a subfolder within song_specific_temp_base for this source's raw downloads
-            source_attempt_temp_folder = os.path.join(song_specific_temp_base, sanitize_filename(source_name) + "_raw_downloads")
-            
-            raw_audio_path_from_source = self._execute_download_attempt(
-                track_info, search_prefix_n, source_name, source_attempt_temp_folder
-            )
-
-            if raw_audio_path_from_source and os.path.exists(raw_audio_path_from_source):
-                logger.info(f"Raw audio obtained from {source_name}: {raw_audio_path_from_source}. Converting and validating.")
-                if convert_to_mp3_320kbps(
-                    raw_audio_path_from_source, final_mp3_path, 
-                    artist=original_artist, title=original_name,
-                    album=track_info.get('album'), track_number=track_info.get('track_number'),
-                    year=track_info.get('year'), cover_image_path=temp_cover_image_path
-                ):
-                    if validate_mp3_320kbps(final_mp3_path, expected_duration_ms=track_info.get('duration_ms')):
-                        logger.info(f"Successfully PROCESSED and VALIDATED from {source_name}: {final_mp3_path}")
-                        final_validated_mp3_path = final_mp3_path
-                        successful_source_name = source_name
-                        track_info['download_source'] = successful_source_name
-                        try:
-                            with open(metadata_json_path, 'w', encoding='utf-8') as f_json:
-                                json.dump(track_info, f_json, ensure_ascii=False, indent=4)
-                            logger.info(f"Saved metadata to: {metadata_json_path}")
-                        except Exception as e_json:
-                            logger.error(f"Failed to save metadata JSON for {final_mp3_path}: {e_json}")
-                        break # Success, stop trying other sources
+        # Sources are raced: each later source starts after a short head start for the preferred ones,
+        # and the first raw file that converts and validates wins. cancel_event stops the others.
+        cancel_event = threading.Event()
+        no_match_count = 0 # Sources whose search worked but had nothing that passed the filters
+        with ThreadPoolExecutor(max_workers=len(sources_to_try)) as source_executor:
+            try:
+                source_futures = {}
+                for source_name, search_prefix_n in sources_to_try:
+                    if source_futures:
+                        wait(source_futures, timeout=SOURCE_HEDGE_DELAY_S, return_when=FIRST_COMPLETED)
+                    source_futures[source_executor.submit(
+                        self._attempt_source, track_info, source_name, search_prefix_n, song_specific_temp_base, cancel_event
+                    )] = source_name
+
+                for future in as_completed(source_futures):
+                    source_name = source_futures[future]
+                    try:
+                        raw_audio_path_from_source, no_match = future.result()
+                    except Exception as e_source:
+                        logger.error(f"Unexpected error trying {source_name} for '{original_artist} - {original_name}': {e_source}")
+                        raw_audio_path_from_source, no_match = None, False
+                    no_match_count += no_match
+
+                    if raw_audio_path_from_source and os.path.exists(raw_audio_path_from_source):
+                        logger.info(f"Raw audio obtained from {source_name}: {raw_audio_path_from_source}. Converting and validating.")
+                        if cover_future is not None:
+                            temp_cover_image_path = cover_future.result()
+                            cover_future = None
+                        with self._transcode_slots:
+                            converted = convert_to_mp3_320kbps(
+                                raw_audio_path_from_source, final_mp3_path, 
+                                artist=original_artist, title=original_name,
+                                album=track_info.get('album'), track_number=track_info.get('track_number'),
+                                year=track_info.get('year'), cover_image_path=temp_cover_image_path
+                            )
+                        if converted:
+                            if validate_mp3_320kbps(final_mp3_path, expected_duration_ms=track_info.get('duration_ms')):
+                                logger.info(f"Successfully PROCESSED and VALIDATED from {source_name}: {final_mp3_path}")
+                                final_validated_mp3_path = final_mp3_path
+                                successful_source_name = source_name
+                                track_info['download_source'] = successful_source_name
+                                self._remember_track(final_mp3_path, successful_source_name)
+                                self._set_failed(sanitized_track_name, False)
+                                try:
+                                    # Written to a temp file and swapped in, so a reader never sees a half-written JSON
+                                    temp_json_path = f"{metadata_json_path}.tmp"
+                                    with open(temp_json_path, 'w', encoding='utf-8') as f_json:
+                                        f_json.write(json.dumps(track_info, ensure_ascii=False, indent=4))
+                                    os.replace(temp_json_path, metadata_json_path)
+                                    logger.info(f"Saved metadata to: {metadata_json_path}")
+                                except Exception as e_json:
+                                    logger.error(f"Failed to save metadata JSON for {final_mp3_path}: {e_json}")
+                                break # Success, stop waiting for other sources
+                            else:
+                                logger.warning(f"Validation FAILED for {final_mp3_path} (from {source_name}). Will try next source if available.")
+                                if os.path.exists(final_mp3_path): # Clean up failed MP3 conversion
+                                    try: os.remove(final_mp3_path)
+                                    except OSError: logger.error(f"Could not remove failed MP3 {final_mp3_path}")
+                        else:
+                            logger.warning(f"Conversion to MP3 FAILED for raw audio from {source_name} ({raw_audio_path_from_source}). Will try next source if available.")
+                        # Raw audio from this source attempt is no longer needed or failed processing
+                        # The base temp folder (including every source's raw downloads) is cleaned at the end
                     else:
-                        logger.warning(f"Validation FAILED for {final_mp3_path} (from {source_name}). Will try next source if available.")
-                        if os.path.exists(final_mp3_path): # Clean up failed MP3 conversion
-                            try: os.remove(final_mp3_path)
-                            except OSError: logger.error(f"Could not remove failed MP3 {final_mp3_path}")
-                else:
-                    logger.warning(f"Conversion to MP3 FAILED for raw audio from {source_name} ({raw_audio_path_from_source}). Will try next source if available.")
-                # Raw audio from this source attempt is no longer needed or failed processing
-                # shutil.rmtree(source_attempt_temp_folder) # Clean up specific raw download folder for this source is too aggressive here, base folder cleaned at end
-            else:
-                logger.info(f"No suitable raw audio obtained from {source_name} for '{original_artist} - {original_name}'.")
-        
+                        logger.info(f"No suitable raw audio obtained from {source_name} for '{original_artist} - {original_name}'.")
+            finally:
+                cancel_event.set() # Winner found (or all done); stop whatever is still searching or downloading
+
+        if cover_future is not None:
+            cover_future.result() # Let the cover thread finish writing before its folder is removed
+
         # After trying all sources, clean up the main temporary base folder for this song
         if os.path.exists(song_specific_temp_base):
             try:
@@ -317,6 +746,9 @@ class SpotifyDownloader:
         
         if not final_validated_mp3_path:
             logger.error(f"All download and processing attempts FAILED for: {original_artist} - {original_name}")
+            # Only a clean miss on every source is remembered; errors (offline, no ffmpeg, ...) are retried next run
+            if no_match_count == len(sources_to_try):
+                self._set_failed(sanitized_track_name, True)
             # Ensure a partially created (but failed validation) MP3 is removed if it still exists
             if os.path.exists(final_mp3_path):
                  logger.warning(f"Ensuring removal of incomplete/invalid output file: {final_mp3_path}")
@@ -327,15 +759,9 @@ class SpotifyDownloader:
 
 # Example usage (for testing this module directly):
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     print("Testing SpotifyDownloader with iterative source attempts...")
-    load_dotenv_path = os.path.join(os.path.dirname(__file__), "..", ".env")
-    from dotenv import load_dotenv
-    if os.path.exists(load_dotenv_path):
-        load_dotenv(dotenv_path=load_dotenv_path)
-        print(f"Loaded .env file from: {load_dotenv_path}")
-    else:
-        print(f".env file not found. Credentials must be set as env vars.")
-
+    # Credentials come from config, which already loaded .env on import.
     if not SPOTIPY_CLIENT_ID or not SPOTIPY_CLIENT_SECRET:
         print("Spotify API credentials not found. Skipping direct test.")
     else:
@@ -349,10 +775,11 @@ if __name__ == "__main__":
             ensure_dir_exists(test_download_folder)
             print(f"Test download folder: {test_download_folder}")
 
-            # Test with the first 2 tracks from the playlist
-            for i, track_to_test in enumerate(tracks[:2]): 
-                print(f"\n--- Downloading Test Track {i+1}: {track_to_test['artist']} - {track_to_test['name']} ---")
-                downloaded_path, source = downloader.download_song(track_to_test, test_download_folder)
+            # Test with the first 2 tracks from the playlist, downloaded in parallel
+            tracks_to_test = tracks[:2]
+            results = downloader.download_songs(tracks_to_test, test_download_folder)
+            for i, (track_to_test, (downloaded_path, source)) in enumerate(zip(tracks_to_test, results)):
+                print(f"\n--- Test Track {i+1}: {track_to_test['artist']} - {track_to_test['name']} ---")
                 if downloaded_path:
                     print(f"SUCCESS: Test track {i+1} downloaded from {source} to: {downloaded_path}")
                     if os.path.exists(downloaded_path):
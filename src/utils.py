@@ -1,32 +1,47 @@
 """Utility functions for the Music Ripper application."""
 
+import functools
 import os
 import re
 import logging
 
-# Configure basic logging (can be expanded)
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# No logging configuration here: the application (main.setup_logging) owns handlers and levels.
+logger = logging.getLogger(__name__)
 
+# Runs of characters not allowed in filenames on Windows (< > : " / \ | ? *), whitespace and underscores.
+# Invalid characters become '_' and '_' runs collapse anyway, so one pass gives the same result as two.
+_SEPARATOR_RUNS_RE = re.compile(r'[<>:"/\\|?*\s_]+')
 
+
+@functools.lru_cache(maxsize=8192) # Each track's name is sanitized several times per download
 def sanitize_filename(filename: str) -> str:
     """Removes or replaces characters that are invalid in filenames."""
-    # Remove invalid characters (e.g., < > : " / \ | ? *)
-    sanitized = re.sub(r'[<>:"/\\|?*]', '_', filename)
-    # Replace multiple spaces/underscores with a single underscore
-    sanitized = re.sub(r'[\s_]+', '_', sanitized)
+    # Replace invalid characters and runs of spaces/underscores with a single underscore
+    sanitized = _SEPARATOR_RUNS_RE.sub('_', filename)
     # Remove leading/trailing underscores or spaces
     sanitized = sanitized.strip('_')
     return sanitized
 
 def ensure_dir_exists(dir_path: str):
-    """Ensures that a directory exists, creates it if not."""
-    if not os.path.exists(dir_path):
+    """
+    Ensures that a directory exists, creates it if not. Safe to call from several threads for the same path.
+    A single mkdir covers both the already-exists case and the usual new leaf folder; missing parents fall back to makedirs.
+    """
+    try:
         try:
-            os.makedirs(dir_path)
-            logging.info(f"Created directory: {dir_path}")
-        except OSError as e:
-            logging.error(f"Error creating directory {dir_path}: {e}")
-            raise
+            os.mkdir(dir_path)
+        except FileNotFoundError:
+            os.makedirs(dir_path, exist_ok=True)
+    except FileExistsError:
+        # Only stat on this branch: mkdir/makedirs also raise FileExistsError when a file is in the way
+        if os.path.isdir(dir_path):
+            return
+        logger.error(f"Error creating directory {dir_path}: path exists and is not a directory")
+        raise NotADirectoryError(f"Path exists and is not a directory: {dir_path}")
+    except OSError as e:
+        logger.error(f"Error creating directory {dir_path}: {e}")
+        raise
+    logger.info(f"Created directory: {dir_path}")
 
 # More utility functions will be added here, e.g.:
 # - validate_mp3_320kbps (using pydub)